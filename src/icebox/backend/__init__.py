@@ -1,15 +1,27 @@
-import icebox.backend.folder
-import icebox.backend.s3
-import icebox.backend.webdav
+from icebox.data import BackendError
+
+
+def _folder(box_path, box_config):
+    from icebox.backend import folder
+    return folder.Backend(box_path, box_config)
+
+
+def _s3(box_path, box_config):
+    from icebox.backend import s3
+    return s3.Backend(box_path, box_config)
+
+
+def _webdav(box_path, box_config):
+    from icebox.backend import webdav
+    return webdav.Backend(box_path, box_config)
+
+
+_BACKENDS = {'folder': _folder, 's3': _s3, 'webdav': _webdav}
 
 
 def get_backend(name, box_path, box_config):
     """Return a backend instance for the given name."""
-    if name == 'folder':
-        return icebox.backend.folder.Backend(box_path, box_config)
-    elif name == 's3':
-        return icebox.backend.s3.Backend(box_path, box_config)
-    elif name == 'webdav':
-        return icebox.backend.webdav.Backend(box_path, box_config)
-    else:
-        raise Exception('Unsupported backend: ' + name)
+    factory = _BACKENDS.get(name)
+    if factory is None:
+        raise BackendError('Unsupported backend: ' + name)
+    return factory(box_path, box_config)
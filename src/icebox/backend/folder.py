@@ -1,9 +1,15 @@
+import os
 from pathlib import Path
 import shutil
+import time
 
 from icepack.helper import File
 
-from icebox.data import BackendFile, JobStatus
+from icebox.data import BackendError, BackendFile, JobStatus
+
+
+COPY_BUFSIZE = 1024 * 1024
+SNAPSHOT_TTL = 1.0
 
 
 class Backend():
@@ -13,11 +19,14 @@ class Backend():
         self.box_path = box_path
         self.box_config = box_config
         self.folder_path = Path(box_config['folder_path'])
+        self._folder_str = os.fspath(self.folder_path) + os.sep
+        self._snapshot = None
+        self._snapshot_time = 0.0
 
     def box_init(self):
         """Optional box initialization at creation time."""
         if not self.folder_path.exists():
-            raise Exception(f'No such folder: {self.folder_path}')
+            raise BackendError(f'No such folder: {self.folder_path}')
 
     def store_data(self, src_path, name):
         """Store the data file as name, return a retrieval key."""
@@ -33,23 +42,24 @@ class Backend():
 
     def retrieve_status(self, job_key):
         """Return the JobStatus of the given job."""
-        file_path = self.folder_path.joinpath(job_key)
-        if file_path.exists():
+        if job_key in self._snapshot_names():
             return JobStatus.success
         else:
             return JobStatus.failure
 
     def retrieve_finish(self, job_key):
         """Finish the job, return the temporary file's Path."""
-        file_path = self.folder_path.joinpath(job_key)
         tmp_path = File.mktemp()
-        shutil.copy(str(file_path), str(tmp_path))
+        _fastcopy(self._folder_str + job_key, tmp_path)
         return tmp_path
 
     def delete(self, retrieval_key):
         """Delete the data for the given retrieval key."""
-        file_path = self.folder_path.joinpath(retrieval_key)
-        file_path.unlink(missing_ok=True)
+        try:
+            os.unlink(self._folder_str + retrieval_key)
+        except FileNotFoundError:
+            pass
+        self._snapshot = None
 
     def inventory_init(self):
         """Initiate an inventory job, return the job key."""
@@ -60,16 +70,69 @@ class Backend():
         return JobStatus.success
 
     def inventory_finish(self, job_key):
-        """Return a list of BackendFiles."""
-        result = []
-        for c in self.folder_path.iterdir():
-            if not c.is_file():
-                continue
-            result.append(BackendFile(c.name, c.name, c.stat().st_size))
-        return result
+        """Return an iterable of BackendFiles."""
+        with os.scandir(self.folder_path) as entries:
+            for e in entries:
+                if not e.is_file():
+                    continue
+                yield BackendFile(e.name, e.name, e.stat().st_size)
+
+    def _snapshot_names(self):
+        """Return a cached snapshot of the folder's entry names."""
+        now = time.monotonic()
+        if self._snapshot is None or now - self._snapshot_time >= SNAPSHOT_TTL:
+            self._snapshot = frozenset(os.listdir(self.folder_path))
+            self._snapshot_time = now
+        return self._snapshot
 
     def _store(self, src_path, name):
         """Store the file at src_path as name, return a retrieval key."""
-        dst_path = self.folder_path.joinpath(name)
-        shutil.copy(str(src_path), str(dst_path))
+        _fastcopy(src_path, self._folder_str + name)
+        self._snapshot = None
         return name
+
+
+def _fastcopy(src_path, dst_path):
+    """Copy src_path to dst_path, staying in kernel space if possible."""
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        size = os.fstat(src.fileno()).st_size
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(src.fileno(), 0, size, os.POSIX_FADV_SEQUENTIAL)
+        if hasattr(os, 'copy_file_range') and _copy_file_range(src, dst, size):
+            return
+        if hasattr(os, 'sendfile') and _sendfile(src, dst, size):
+            return
+        shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+
+
+def _copy_file_range(src, dst, size):
+    """Copy size bytes via os.copy_file_range, return True on success."""
+    offset = 0
+    while offset < size:
+        try:
+            copied = os.copy_file_range(
+                src.fileno(), dst.fileno(), size - offset)
+        except OSError:
+            if offset == 0:
+                return False
+            raise
+        if copied == 0:
+            break
+        offset += copied
+    return True
+
+
+def _sendfile(src, dst, size):
+    """Copy size bytes via os.sendfile, return True on success."""
+    offset = 0
+    while offset < size:
+        try:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, size)
+        except OSError:
+            if offset == 0:
+                return False
+            raise
+        if sent == 0:
+            break
+        offset += sent
+    return True
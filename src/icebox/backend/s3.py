@@ -1,13 +1,23 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 from icepack.helper import File
 
-from icebox.data import BackendFile, JobStatus
+from icebox.data import BackendError, BackendFile, JobStatus
 
 
 RESTORE_COMPLETE = 'ongoing-request="false"'
 RESTORE_RUNNING = 'ongoing-request="true"'
 
+TRANSFER_CONFIG = TransferConfig(max_concurrency=8)
+
+CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    connect_timeout=10,
+    read_timeout=300)
+
 
 class Backend():
     """Backend for Amazon S3-backed boxes."""
@@ -20,7 +30,8 @@ class Backend():
         profile = box_config['profile']
         bucket = box_config['bucket']
         session = boto3.session.Session(profile_name=profile)
-        self.bucket = session.resource('s3').Bucket(bucket)
+        s3 = session.resource('s3', config=CLIENT_CONFIG)
+        self.bucket = s3.Bucket(bucket)
 
     def box_init(self):
         """Optional box initialization at creation time."""
@@ -57,14 +68,11 @@ class Backend():
             return JobStatus.running
         if RESTORE_COMPLETE in obj.restore:
             return JobStatus.success
-        raise Exception(f'Unsupported restore state: {obj.restore}')
+        raise BackendError(f'Unsupported restore state: {obj.restore}')
 
     def retrieve_finish(self, job_key):
         """Finish the job, return the temporary file's Path."""
         obj = self.bucket.Object(job_key)
-        if obj.storage_class and \
-                (obj.restore is None or RESTORE_COMPLETE not in obj.restore):
-            raise Exception('Job was not successful.')
         tmp_path = File.mktemp()
         obj.download_file(str(tmp_path))
         return tmp_path
@@ -83,12 +91,13 @@ class Backend():
         return JobStatus.success
 
     def inventory_finish(self, job_key):
-        """Return a list of BackendFiles."""
-        objects = self.bucket.objects.all()
-        return [BackendFile(o.key, o.key, o.size) for o in objects]
+        """Return an iterable of BackendFiles."""
+        for o in self.bucket.objects.all():
+            yield BackendFile(o.key, o.key, o.size)
 
     def _store(self, filename, name, storage_class):
         """Store filename as name, return a retrieval key."""
         args = {'StorageClass': storage_class}
-        self.bucket.upload_file(filename, name, ExtraArgs=args)
+        self.bucket.upload_file(
+            filename, name, ExtraArgs=args, Config=TRANSFER_CONFIG)
         return name
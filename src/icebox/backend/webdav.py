@@ -2,7 +2,7 @@ from webdav4.client import Client
 
 from icepack.helper import File
 
-from icebox.data import BackendFile, JobStatus
+from icebox.data import BackendError, BackendFile, JobStatus
 
 
 class Backend():
@@ -15,9 +15,9 @@ class Backend():
         username = box_config.get('username')
         password = box_config.get('password')
         if not username:
-            raise Exception('No username specified.')
+            raise BackendError('No username specified.')
         if not password:
-            raise Exception('No password specified.')
+            raise BackendError('No password specified.')
         self.client = Client(url, auth=(username, password))
 
     def box_init(self):
@@ -65,11 +65,8 @@ class Backend():
         return JobStatus.success
 
     def inventory_finish(self, job_key):
-        """Return a list of BackendFiles."""
-        result = []
+        """Return an iterable of BackendFiles."""
         for c in self.client.ls('', detail=True):
             if c['type'] != 'file':
                 continue
-            file = BackendFile(c['name'], c['name'], c['content_length'])
-            result.append(file)
-        return result
+            yield BackendFile(c['name'], c['name'], c['content_length'])
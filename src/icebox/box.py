@@ -1,10 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import secrets
 from shutil import rmtree
 import sqlite3
+import threading
 import time
-import uuid
 
 from retry.api import retry_call
 import yaml
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
 
 from icepack import IcepackReader, create_archive, extract_archive
 from icepack.helper import File, SSH, Zip
@@ -13,11 +21,12 @@ from icepack.meta import SECRET_KEY
 
 from icebox import SECRET_KEY
 from icebox.backend import get_backend
-from icebox.data import JobStatus, Source
+from icebox.data import BoxError, JobStatus, Source
 
 
 DATA_SUFFIX = '.data'
 META_SUFFIX = '.meta'
+SUFFIX_LEN = len(DATA_SUFFIX)
 
 SQL_SCHEMA_VERSION = '3'
 SQL_CREATE_SOURCES = '''CREATE TABLE IF NOT EXISTS sources (
@@ -42,6 +51,12 @@ RETRY_TRIES = 5
 RETRY_DELAY = 30
 RETRY_BACKOFF = 3
 
+POLL_DELAY_MIN = 5
+POLL_DELAY_MAX = 300
+POLL_BACKOFF = 1.5
+
+REFRESH_WORKERS = 8
+
 
 class Box():
     """Box configuration and mappings."""
@@ -49,9 +64,9 @@ class Box():
     def __init__(self, path):
         self.path = path
         self.config_file = self.path / 'config.yml'
+        self._backend_instance = None
         if self.exists():
-            with open(self.config_file, 'r') as f:
-                self.config = yaml.safe_load(f)
+            self.config = self._load_config()
             self._db = SQLite(path)
         else:
             self.config = {}
@@ -63,16 +78,20 @@ class Box():
     def init(self, log=lambda msg: None):
         """Initialize this box on creation."""
         if self.exists():
-            raise Exception('Box already initialized.')
-        self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+            raise BoxError('Box already initialized.')
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.path.mkdir(mode=0o700, exist_ok=True)
         self._db = SQLite(self.path)
         if not (self.path / SECRET_KEY).exists():
             log('- Generating encryption keys.')
             SSH.keygen(self.path)
         backend = self._backend()
         backend.box_init()
-        with open(self.config_file, 'w') as f:
-            yaml.safe_dump(self.config, f, default_flow_style=False)
+        data = yaml.dump(
+            self.config, Dumper=YamlDumper, default_flow_style=False)
+        tmp_path = File.mktemp(parent=self.path)
+        tmp_path.write_text(data)
+        tmp_path.replace(self.config_file)
 
     def store(
             self,
@@ -84,7 +103,7 @@ class Box():
             log=lambda msg: None):
         """Encrypt the given source and store in backend."""
         if not self.exists():
-            raise Exception('Box not found.')
+            raise BoxError('Box not found.')
         backend = self._backend()
         temp_path = File.mktemp(directory=True)
         data_path = temp_path / (src_path.name + '.zip')
@@ -105,20 +124,25 @@ class Box():
             source.size = data_path.stat().st_size
             log('Transferring to backend.')
             data_name, meta_name = _backend_names()
-            source.data_key = retry_call(
-                backend.store_data,
-                fargs=[data_path, data_name],
-                tries=RETRY_TRIES,
-                delay=RETRY_DELAY,
-                backoff=RETRY_BACKOFF,
-                on_exception=_retry_exc('Archive upload', log))
-            source.meta_key = retry_call(
-                backend.store_meta,
-                fargs=[meta_path, meta_name],
-                tries=RETRY_TRIES,
-                delay=RETRY_DELAY,
-                backoff=RETRY_BACKOFF,
-                on_exception=_retry_exc('Metadata upload', log))
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                data_future = executor.submit(
+                    retry_call,
+                    backend.store_data,
+                    fargs=[data_path, data_name],
+                    tries=RETRY_TRIES,
+                    delay=RETRY_DELAY,
+                    backoff=RETRY_BACKOFF,
+                    on_exception=_retry_exc('Archive upload', log))
+                meta_future = executor.submit(
+                    retry_call,
+                    backend.store_meta,
+                    fargs=[meta_path, meta_name],
+                    tries=RETRY_TRIES,
+                    delay=RETRY_DELAY,
+                    backoff=RETRY_BACKOFF,
+                    on_exception=_retry_exc('Metadata upload', log))
+                source.data_key = data_future.result()
+                source.meta_key = meta_future.result()
             self._db.save_source(source)
         finally:
             rmtree(temp_path, ignore_errors=True)
@@ -133,11 +157,13 @@ class Box():
             log=lambda msg: None):
         """Retrieve source from the backend and decrypt."""
         if not self.exists():
-            raise Exception('Box not found.')
+            raise BoxError('Box not found.')
         backend = self._backend()
         data_path = None
         try:
             source = self._db.load_source(name)
+            if source is None:
+                raise BoxError('Source not found in box.')
             # Get existing retrieval job or start a new one
             job = self._db.load_job(name)
             if job is None:
@@ -148,12 +174,14 @@ class Box():
             status = backend.retrieve_status(job)
             if status == JobStatus.running:
                 log('Transfer from backend pending.')
+            delay = POLL_DELAY_MIN
             while status == JobStatus.running:
-                time.sleep(60)
+                time.sleep(delay)
+                delay = _poll_delay(delay)
                 status = backend.retrieve_status(job)
             if status == JobStatus.failure:
                 self._db.delete_job(name)
-                raise Exception('Transfer from backend failed.')
+                raise BoxError('Transfer from backend failed.')
             # Download the data file
             log('Transferring from backend.')
             data_path = retry_call(
@@ -179,15 +207,17 @@ class Box():
     def contains(self, source):
         """Return True if the source name exists in this box."""
         if not self.exists():
-            raise Exception('Box not found.')
-        return self._db.load_source(source) is not None
+            raise BoxError('Box not found.')
+        return self._db.has_source(source)
 
     def delete(self, source):
         """Delete encrypted data and metadata in the backend."""
         if not self.exists():
-            raise Exception('Box not found.')
+            raise BoxError('Box not found.')
         backend = self._backend()
         src = self._db.load_source(source)
+        if src is None:
+            raise BoxError('Source not found in box.')
         backend.delete(src.data_key)
         backend.delete(src.meta_key)
         self._db.delete_source(source)
@@ -195,13 +225,13 @@ class Box():
     def sources(self):
         """Return information about known sources."""
         if not self.exists():
-            raise Exception('Box not found.')
+            raise BoxError('Box not found.')
         return self._db.load_sources()
 
     def refresh(self, backend_options, log=lambda msg: None):
         """Refresh local information from the backend."""
         if not self.exists():
-            raise Exception('Box not found.')
+            raise BoxError('Box not found.')
         backend = self._backend()
         inventory_job = self._db.load_job(INVENTORY_JOB)
         if inventory_job is None:
@@ -211,12 +241,14 @@ class Box():
         status = backend.inventory_status(inventory_job)
         if status == JobStatus.running:
             log('- Inventory retrieval pending.')
+        delay = POLL_DELAY_MIN
         while status == JobStatus.running:
-            time.sleep(60)
+            time.sleep(delay)
+            delay = _poll_delay(delay)
             status = backend.inventory_status(inventory_job)
         if status == JobStatus.failure:
             self._db.delete_job(INVENTORY_JOB)
-            raise Exception('Inventory retrieval failed.')
+            raise BoxError('Inventory retrieval failed.')
         log('- Inventory retrieval finished.')
 
         sources = self.sources()
@@ -224,44 +256,59 @@ class Box():
         check = InventoryCheck(sources, inventory)
 
         jobs = {}
+        new_jobs = []
         for meta, data in check.importable.items():
             job = self._db.load_job(meta.key)
             if job is None:
                 log(f'- Initiating metadata retrieval: {meta.key}')
                 job = backend.retrieve_init(meta.key, backend_options)
-                self._db.save_job(meta.key, job)
+                new_jobs.append((meta.key, job))
             jobs[job] = meta
+        if new_jobs:
+            self._db.save_jobs(new_jobs)
+        delay = POLL_DELAY_MIN
         while jobs:
             finished = []
+            done_keys = []
+            successes = []
+            statuses = self._poll_all(backend, list(jobs))
             for job, meta in jobs.items():
-                status = backend.retrieve_status(job)
-                if status != JobStatus.running:
-                    self._db.delete_job(meta.key)
+                status = statuses[job]
                 if status == JobStatus.failure:
-                    raise Exception(f'Metadata retrieval failed: {meta.key})')
+                    self._db.delete_job(meta.key)
+                    raise BoxError(f'Metadata retrieval failed: {meta.key})')
                 elif status == JobStatus.success:
-                    meta_path = backend.retrieve_finish(job)
-                    with IcepackReader(meta_path, self.path) as archive:
-                        name = archive.metadata.archive_name
-                    if name.endswith('.zip'):
-                        name = name[:-4]
-                    data = check.importable[meta]
-                    src = Source(name)
-                    src.comment = archive.metadata.comment
-                    src.size = data.size
-                    src.data_key = data.key
-                    src.meta_key = meta.key
-                    meta_path.unlink()
-                    if not self.contains(src.name):
-                        self._db.save_source(src)
-                        log(f'- Added {src.name} = {meta.key}')
-                    else:
-                        log(f'- Ignoring duplicate {src.name} = {meta.key}')
-                    finished.append(job)
-            jobs = {j: k for j, k in jobs.items() if j not in finished}
+                    done_keys.append(meta.key)
+                    successes.append(job)
+            new_sources = []
+            pending_names = set()
+            for job, (name, comment) in self._retrieve_all(backend, successes):
+                meta = jobs[job]
+                data = check.importable[meta]
+                src = Source(name)
+                src.comment = comment
+                src.size = data.size
+                src.data_key = data.key
+                src.meta_key = meta.key
+                if self.contains(src.name) or src.name in pending_names:
+                    log(f'- Ignoring duplicate {src.name} = {meta.key}')
+                else:
+                    new_sources.append(src)
+                    pending_names.add(src.name)
+                    log(f'- Added {src.name} = {meta.key}')
+                finished.append(job)
+            if new_sources:
+                self._db.save_sources(new_sources)
+            if done_keys:
+                self._db.delete_jobs(done_keys)
+            if finished:
+                delay = POLL_DELAY_MIN
+            for job in finished:
+                del jobs[job]
             if jobs:
                 log(f'- Metadata retrievals pending: {len(jobs)}')
-                time.sleep(60)
+                time.sleep(delay)
+                delay = _poll_delay(delay)
         self._db.delete_job(INVENTORY_JOB)
 
         if check.broken_sources:
@@ -275,8 +322,62 @@ class Box():
                 log(f'  {f.key}')
 
     def _backend(self):
-        """Return a backend instance for this box."""
-        return get_backend(self.config['backend'], self.path, self.config)
+        """Return the backend instance for this box."""
+        if self._backend_instance is None:
+            self._backend_instance = get_backend(
+                self.config['backend'], self.path, self.config)
+        return self._backend_instance
+
+    def _poll_all(self, backend, job_keys):
+        """Poll job statuses concurrently, return a job to status dict."""
+        if len(job_keys) < 2:
+            return {j: backend.retrieve_status(j) for j in job_keys}
+        with ThreadPoolExecutor(max_workers=REFRESH_WORKERS) as executor:
+            statuses = executor.map(backend.retrieve_status, job_keys)
+            return dict(zip(job_keys, statuses))
+
+    def _retrieve_all(self, backend, job_keys):
+        """Retrieve and parse job metadata concurrently.
+
+        Returns (job, (name, comment)) tuples.
+        """
+        if len(job_keys) < 2:
+            return [(j, self._retrieve_meta(backend, j)) for j in job_keys]
+        with ThreadPoolExecutor(max_workers=REFRESH_WORKERS) as executor:
+            results = executor.map(
+                lambda j: self._retrieve_meta(backend, j), job_keys)
+            return list(zip(job_keys, results))
+
+    def _retrieve_meta(self, backend, job):
+        """Retrieve and parse a metadata file, return (name, comment)."""
+        meta_path = backend.retrieve_finish(job)
+        try:
+            with IcepackReader(meta_path, self.path) as archive:
+                name = archive.metadata.archive_name
+                comment = archive.metadata.comment
+        finally:
+            meta_path.unlink(missing_ok=True)
+        if name.endswith('.zip'):
+            name = name[:-4]
+        return name, comment
+
+    def _load_config(self):
+        """Load the configuration, via the JSON cache if it is current."""
+        mtime = self.config_file.stat().st_mtime
+        cache_file = self.path / 'config.cache'
+        try:
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache['mtime'] == mtime:
+                return cache['config']
+        except (OSError, ValueError, KeyError):
+            pass
+        with open(self.config_file, 'r') as f:
+            config = yaml.load(f, Loader=YamlLoader)  # nosec B506 SafeLoader
+        tmp_path = File.mktemp(parent=self.path)
+        tmp_path.write_text(json.dumps({'mtime': mtime, 'config': config}))
+        tmp_path.replace(cache_file)
+        return config
 
 
 class InventoryCheck():
@@ -300,9 +401,13 @@ class InventoryCheck():
         # Check backend files
         self.importable = {}
         self.broken_backend = []
-        inventory = backend_keys.values()
-        backend_data = self._map_by_name_suffix(inventory, DATA_SUFFIX)
-        backend_meta = self._map_by_name_suffix(inventory, META_SUFFIX)
+        backend_data = {}
+        backend_meta = {}
+        for f in backend_keys.values():
+            if f.name.endswith(DATA_SUFFIX):
+                backend_data[f.name] = f
+            elif f.name.endswith(META_SUFFIX):
+                backend_meta[f.name] = f
         for name, data in backend_data.items():
             meta = backend_meta.pop(_sibling(name), None)
             if meta:
@@ -311,18 +416,18 @@ class InventoryCheck():
                 self.broken_backend.append(data)
         self.broken_backend.extend(backend_meta.values())
 
-    @staticmethod
-    def _map_by_name_suffix(inventory, suffix):
-        """Map name to BackendFile by name suffix."""
-        return {f.name: f for f in inventory if f.name.endswith(suffix)}
-
 
 class SQLite():
     """SQLite wrapper for source and job state."""
 
     def __init__(self, path):
         db_path = path.joinpath('box.db')
-        self._conn = sqlite3.connect(str(db_path))
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA temp_store=MEMORY')
+        self._conn.execute('PRAGMA busy_timeout=3000')
         self._ensure_tables()
 
     def load_source(self, name):
@@ -339,6 +444,14 @@ class SQLite():
         else:
             return None
 
+    def has_source(self, name):
+        """Return True if a Source with the given name exists."""
+        stmt = 'SELECT 1 FROM sources WHERE name=?'
+        c = self._conn.execute(stmt, (name,))
+        r = c.fetchone()
+        c.close()
+        return r is not None
+
     def load_sources(self):
         """Return an iterable for all Sources."""
         stmt = '''SELECT name, comment, size, data_key, meta_key
@@ -346,10 +459,15 @@ class SQLite():
                   ORDER BY name COLLATE NOCASE
                   '''
         c = self._conn.execute(stmt)
+        c.arraysize = 256
 
         def generator():
-            for r in c:
-                yield self._to_source(r)
+            while True:
+                rows = c.fetchmany()
+                if not rows:
+                    break
+                for r in rows:
+                    yield self._to_source(r)
             c.close()
 
         return generator()
@@ -367,13 +485,26 @@ class SQLite():
             source.data_key,
             source.meta_key
         )
-        with self._conn:
+        with self._lock, self._conn:
             self._conn.execute(stmt, values)
 
+    def save_sources(self, sources):
+        """Save the given Sources in one transaction."""
+        stmt = '''INSERT INTO sources
+                  (name, comment, size, data_key, meta_key)
+                  VALUES (?, ?, ?, ?, ?)
+                  '''
+        values = [
+            (s.name, s.comment, s.size, s.data_key, s.meta_key)
+            for s in sources
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(stmt, values)
+
     def delete_source(self, name):
         """Delete a Source by name."""
         stmt = 'DELETE FROM sources WHERE name=?'
-        with self._conn:
+        with self._lock, self._conn:
             self._conn.execute(stmt, (name,))
 
     def load_job(self, name):
@@ -391,17 +522,34 @@ class SQLite():
         """Save the job key for the given name."""
         stmt = 'INSERT INTO jobs (name, key) VALUES (?, ?)'
         values = (name, key)
-        with self._conn:
+        with self._lock, self._conn:
             self._conn.execute(stmt, values)
 
+    def save_jobs(self, jobs):
+        """Save the given (name, key) tuples in one transaction."""
+        stmt = 'INSERT INTO jobs (name, key) VALUES (?, ?)'
+        with self._lock, self._conn:
+            self._conn.executemany(stmt, jobs)
+
     def delete_job(self, name):
         """Delete the job key for the given name."""
         stmt = 'DELETE FROM jobs WHERE name=?'
-        with self._conn:
+        with self._lock, self._conn:
             self._conn.execute(stmt, (name,))
 
+    def delete_jobs(self, names):
+        """Delete the job keys for the given names in one transaction."""
+        stmt = 'DELETE FROM jobs WHERE name=?'
+        with self._lock, self._conn:
+            self._conn.executemany(stmt, ((n,) for n in names))
+
     def _ensure_tables(self):
         """Ensure all tables exist and are up to date."""
+        c = self._conn.execute('PRAGMA user_version')
+        version = c.fetchone()[0]
+        c.close()
+        if version == int(SQL_SCHEMA_VERSION):
+            return
         with self._conn:
             self._conn.execute(SQL_CREATE_SETTINGS)
         stmt = 'SELECT value FROM settings WHERE key="schema"'
@@ -415,9 +563,10 @@ class SQLite():
         if schema is None:
             self._create_tables()
         elif schema == SQL_SCHEMA_VERSION:
-            pass
+            # Box created before user_version was stamped
+            self._stamp_version()
         else:
-            raise Exception('Unsupported schema version: ' + str(schema))
+            raise BoxError('Unsupported schema version: ' + str(schema))
 
     def _create_tables(self):
         """Create all tables from scratch."""
@@ -426,6 +575,11 @@ class SQLite():
             self._conn.execute(SQL_CREATE_SOURCES)
             self._conn.execute(SQL_CREATE_JOBS)
             self._conn.execute(schema, SQL_SCHEMA_VERSION)
+        self._stamp_version()
+
+    def _stamp_version(self):
+        """Record the schema version in the database header."""
+        self._conn.execute(f'PRAGMA user_version={int(SQL_SCHEMA_VERSION)}')
 
     @staticmethod
     def _to_source(row):
@@ -441,7 +595,7 @@ class SQLite():
 
 def _backend_names():
     """Return a tuple of names for encrypted data and metadata files."""
-    basename = str(uuid.uuid4())
+    basename = secrets.token_hex(16)
     data_name = basename + DATA_SUFFIX
     meta_name = basename + META_SUFFIX
     return data_name, meta_name
@@ -455,6 +609,12 @@ def _export_metadata(src_path, dst_path):
             dst.add_metadata(meta_path, sig_path)
 
 
+def _poll_delay(delay):
+    """Return the next polling delay, with exponential backoff and jitter."""
+    delay = min(delay * POLL_BACKOFF, POLL_DELAY_MAX)
+    return delay + random.uniform(0, delay * 0.1)  # nosec Not cryptographic
+
+
 def _retry_exc(prefix, log):
     """Return a retry_call() exception handler for logging."""
     tries = RETRY_TRIES
@@ -473,9 +633,10 @@ def _retry_exc(prefix, log):
 
 def _sibling(name):
     """Return the metadata name for a data file and vice versa."""
-    if name.endswith(DATA_SUFFIX):
-        return name[:-len(DATA_SUFFIX)] + META_SUFFIX
-    elif name.endswith(META_SUFFIX):
-        return name[:-len(META_SUFFIX)] + DATA_SUFFIX
+    base, suffix = name[:-SUFFIX_LEN], name[-SUFFIX_LEN:]
+    if suffix == DATA_SUFFIX:
+        return base + META_SUFFIX
+    elif suffix == META_SUFFIX:
+        return base + DATA_SUFFIX
     else:
-        raise Exception(f'Invalid name: {name}')
+        raise BoxError(f'Invalid name: {name}')
@@ -28,7 +28,6 @@ def icebox(ctx, config):
         base_path = Path(click.get_app_dir(NAME))
     else:
         base_path = Path(config)
-    base_path.mkdir(mode=0o700, parents=True, exist_ok=True)
     ctx.obj['base_path'] = base_path
 
 
@@ -58,7 +57,7 @@ def init_folder(ctx, folder_path):
     try:
         box.init(log=click.echo)
     except Exception as e:
-        raise click.ClickException('Initialization failed. ({})'.format(e))
+        raise click.ClickException(f'Initialization failed. ({e})')
     click.echo(f'- Your encryption keys are in {box.path}')
     click.echo('- Make sure to protect and backup this directory!')
     click.echo('Box initialized.')
@@ -85,7 +84,7 @@ def init_s3(ctx, bucket, storage_class, profile):
     try:
         box.init(log=click.echo)
     except Exception as e:
-        raise click.ClickException('Initialization failed. ({})'.format(e))
+        raise click.ClickException(f'Initialization failed. ({e})')
     click.echo(f'- Your encryption keys are in {box.path}')
     click.echo('- Make sure to protect and backup this directory!')
     click.echo('Box initialized.')
@@ -115,7 +114,7 @@ def init_webdav(ctx, url, username, password):
     try:
         box.init(log=click.echo)
     except Exception as e:
-        raise click.ClickException('Initialization failed. ({})'.format(e))
+        raise click.ClickException(f'Initialization failed. ({e})')
     click.echo(f'- Your encryption keys are in {box.path}')
     click.echo('- Make sure to protect and backup this directory!')
     click.echo('Box initialized.')
@@ -191,11 +190,9 @@ def get(ctx, box_name, source, destination, option, mode, mtime):
     box = Box(base_path.joinpath(box_name))
     if not box.exists():
         raise click.ClickException('Box not found.')
-    if not box.contains(source):
-        raise click.ClickException('Source not found in box.')
     timestamp(f'Retrieving "{source}" from box.')
     dst_path = Path(destination)
-    backend_options = dict(o.split('=') for o in option)
+    backend_options = dict(o.split('=', 1) for o in option)
     try:
         box.retrieve(
             source,
@@ -220,8 +217,6 @@ def delete(ctx, box_name, source):
     box = Box(base_path.joinpath(box_name))
     if not box.exists():
         raise click.ClickException('Box not found.')
-    if not box.contains(source):
-        raise click.ClickException('Source not found in box.')
     try:
         box.delete(source)
     except Exception as e:
@@ -263,7 +258,7 @@ def refresh(ctx, box_name, option):
     if not box.exists():
         raise click.ClickException('Box not found.')
     click.echo('Refreshing box.')
-    backend_options = dict(o.split('=') for o in option)
+    backend_options = dict(o.split('=', 1) for o in option)
     try:
         box.refresh(backend_options, log=click.echo)
     except Exception as e:
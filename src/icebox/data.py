@@ -1,4 +1,12 @@
-from enum import Enum
+from enum import IntEnum
+
+
+class BoxError(Exception):
+    """Raised for expected box-level failures."""
+
+
+class BackendError(BoxError):
+    """Raised for expected backend-level failures."""
 
 
 class BackendFile():
@@ -12,7 +20,7 @@ class BackendFile():
         return f'<{self.name}|{self.key}|{self.size}>'
 
 
-class JobStatus(Enum):
+class JobStatus(IntEnum):
     """Status codes for long-running jobs."""
 
     running = 0
@@ -23,6 +31,8 @@ class JobStatus(Enum):
 class Source():
     """Local information on a stored source."""
 
+    __slots__ = ('name', 'comment', 'size', 'data_key', 'meta_key')
+
     def __init__(self, name=None):
         self.name = name
         self.comment = None
@@ -34,14 +44,8 @@ class Source():
         """Comparison method."""
         if not isinstance(other, Source):
             return False
-        if self.name != other.name:
-            return False
-        if self.comment != other.comment:
-            return False
-        if self.size != other.size:
-            return False
-        if self.data_key != other.data_key:
-            return False
-        if self.meta_key != other.meta_key:
-            return False
-        return True
+        return (
+            (self.name, self.comment, self.size,
+             self.data_key, self.meta_key) ==
+            (other.name, other.comment, other.size,
+             other.data_key, other.meta_key))
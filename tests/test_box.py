@@ -35,6 +35,21 @@ class TestSQLite():
         with pytest.raises(Exception) as e:
             db.save_source(source)
 
+    def test_source_save_batch(self, datadir):
+        """Test saving Sources in a batch."""
+        db = SQLite(datadir)
+        sources = [FakeSource('foo'), FakeSource('bar')]
+        db.save_sources(sources)
+        assert db.load_source('foo') == sources[0]
+        assert db.load_source('bar') == sources[1]
+
+    def test_has_source(self, datadir):
+        """Test checking for a Source by name."""
+        db = SQLite(datadir)
+        assert db.has_source('test') is False
+        db.save_source(FakeSource('test'))
+        assert db.has_source('test') is True
+
     def test_source_delete(self, datadir):
         """Test deleting a Source."""
         db = SQLite(datadir)
@@ -74,6 +89,16 @@ class TestSQLite():
         db.delete_job('test')
         assert db.load_job('test') is None
 
+    def test_job_batches(self, datadir):
+        """Test saving and deleting jobs in batches."""
+        db = SQLite(datadir)
+        db.save_jobs([('foo', '1'), ('bar', '2')])
+        assert db.load_job('foo') == '1'
+        assert db.load_job('bar') == '2'
+        db.delete_jobs(['foo', 'bar'])
+        assert db.load_job('foo') is None
+        assert db.load_job('bar') is None
+
 
 class FakeSource(Source):
     """Source for testing."""